@@ -32,14 +32,18 @@ the environment variable LNOTE_DIR.
 """
 __version__ = 'v0.1.0'
 
-import glob
 import fnmatch
 import os
+import re
+import shlex
 import shutil
+import struct
 import subprocess
 import sys
 import time
-import optparse
+import argparse
+import bisect
+from functools import lru_cache
 
 
 # set default data directory, create it if it does not exist
@@ -47,41 +51,61 @@ LNOTE_DIR = os.path.expanduser(os.environ.get('LNOTE_DIR', '~/data/lnote'))
 if not os.path.isdir(LNOTE_DIR):
     os.makedirs(LNOTE_DIR)
 
+# LaTeX preamble and epilog that wrap exported notebooks
+_PREAMBLE = b'\\documentclass{scrartcl}\n' \
+            b'\\usepackage{amsmath}\n' \
+            b'\\usepackage{amsthm}\n' \
+            b'\\usepackage{graphicx}\n' \
+            b'\\usepackage{commath}\n' \
+            b'\\begin{document}\n\n'
+_EPILOG = b'\\end{document}\n'
+
 
 #=====================#
 # Command definitions #
 #=====================#
 
 
+@lru_cache(maxsize=None)
+def _create_parser():
+    """Return the option parser of create()."""
+    op = argparse.ArgumentParser(usage='%(prog)s create [options] NAME ' +
+                                       '[NAME2 NAME3 ...]',
+                                 description=create.__doc__)
+    op.add_argument('--version', action='version', version=__version__)
+    op.add_argument('-t', '--template', default='', type=str,
+                    help='create new notebook from template ' +
+                         '(duplicate an existing notebook)')
+    op.add_argument('-v', '--verbose', default=False, action='store_true',
+                    help='be verbose')
+    op.add_argument('posargs', nargs='*', help=argparse.SUPPRESS)
+    return op
+
+
 def create(*args):
     """Create a notebook."""
-    op = optparse.OptionParser(usage='%prog create [options] NAME ' +
-                                     '[NAME2 NAME3 ...]',
-                               version=__version__,
-                               description=create.__doc__)
-    op.add_option('-t', '--template', default='', type=str,
-                  help='create new notebook from template ' +
-                       '(duplicate an existing notebook)')
-    op.add_option('-v', '--verbose', default=False, action='store_true',
-                  help='be verbose')
+    op = _create_parser()
     if len(args) == 0:
         args = ['--help']
-    opts, posargs = op.parse_args(args=list(args))
+    opts, posargs = parse_args(op, args)
 
     # check if template exists
     if opts.template and not os.path.isdir(os.path.join(LNOTE_DIR, opts.template)):
         print(f'lnote create: template "{opts.template}" not found', file=sys.stderr)
         sys.exit(1)
 
+    existing = set(list_notebooks())
     for name in posargs:
         # check if notebook with that name already exists
-        if name in os.listdir(LNOTE_DIR):
+        if name in existing:
             print('lnote create: cannot create notebook ' +
                   f'"{name}": file exists', file=sys.stderr)
             continue
+        existing.add(name)
 
         # create notebook
         os.mkdir(os.path.join(LNOTE_DIR, name))
+        invalidate_notebooks()
         if opts.verbose:
             print(f'mkdir {os.path.join(LNOTE_DIR, name)}')
         dst = os.path.join(LNOTE_DIR, name, name + '.tex')
@@ -98,28 +122,38 @@ def create(*args):
 
         # copy all other files from the template as well
         if opts.template:
-            for filename in os.listdir(os.path.join(LNOTE_DIR, opts.template)):
-                if filename != opts.template + '.tex':
-                    src = os.path.join(LNOTE_DIR, opts.template, filename)
-                    dst = os.path.join(LNOTE_DIR, name)
-                    shutil.copy(src, dst)
+            with os.scandir(os.path.join(LNOTE_DIR, opts.template)) as entries:
+                for entry in entries:
+                    if entry.name == opts.template + '.tex' \
+                            or not entry.is_file():
+                        continue
+                    dst = os.path.join(LNOTE_DIR, name, entry.name)
+                    shutil.copyfile(entry.path, dst)
                     if opts.verbose:
-                        print(f'cp {src} {dst}')
+                        print(f'cp {entry.path} {dst}')
+
+
+@lru_cache(maxsize=None)
+def _listn_parser():
+    """Return the option parser of listn()."""
+    op = argparse.ArgumentParser(usage='%(prog)s list [options] ' +
+                                       '[PATTERN [PATTERN2 PATTERN3 ...]]',
+                                 description=listn.__doc__)
+    op.add_argument('--version', action='version', version=__version__)
+    op.add_argument('-l', '--long', default=False, action='store_true',
+                    help='use a long listing format. The columns, from left ' +
+                         'to right: 1. number of files, ' +
+                         '2. linecount of tex-file, ' +
+                         '3. total size in bytes, ' +
+                         '4. modification time, 5. notebook name')
+    op.add_argument('posargs', nargs='*', help=argparse.SUPPRESS)
+    return op
 
 
 def listn(*args):
     """List notebooks."""
-    op = optparse.OptionParser(usage='%prog list [options] ' +
-                                     '[PATTERN [PATTERN2 PATTERN3 ...]]',
-                               version=__version__,
-                               description=listn.__doc__)
-    op.add_option('-l', '--long', default=False, action='store_true',
-                  help='use a long listing format. The columns, from left ' +
-                       'to right: 1. number of files, ' +
-                       '2. linecount of tex-file, ' +
-                       '3. total size in bytes, ' +
-                       '4. modification time, 5. notebook name')
-    opts, posargs = op.parse_args(args=list(args))
+    op = _listn_parser()
+    opts, posargs = parse_args(op, args)
     if len(posargs) == 0:
         posargs = ['*']
 
@@ -133,14 +167,11 @@ def listn(*args):
 
     # display selected notebooks
     if opts.long:
+        dirsize_digits = len(str(get_size(LNOTE_DIR)))
         for notebook in notebooks:
             # collect some information about the notebook
-            dirsize = get_size(dirpath(notebook))
-            dirsize_digits = len(str(get_size(LNOTE_DIR)))
-            modtime = get_mtime(dirpath(notebook))
-            filecount = len(os.listdir(dirpath(notebook)))
-            with open(texpath(notebook), 'r') as f:
-                linecount = len(f.readlines())
+            dirsize, filecount, modtime = get_stats(dirpath(notebook))
+            linecount = count_lines(texpath(notebook))
             print('% 3i % 4i % *i %s %s' \
                   % (filecount, linecount, dirsize_digits, dirsize,
                      time.ctime(modtime), notebook))
@@ -148,104 +179,132 @@ def listn(*args):
         printcols(notebooks)
 
 
+@lru_cache(maxsize=None)
+def _rename_parser():
+    """Return the option parser of rename()."""
+    op = argparse.ArgumentParser(usage='%(prog)s rename [options] OLD_NAME ' +
+                                       'NEW_NAME',
+                                 description=rename.__doc__)
+    op.add_argument('--version', action='version', version=__version__)
+    op.add_argument('-v', '--verbose', default=False, action='store_true',
+                    help='be verbose')
+    op.add_argument('posargs', nargs='*', help=argparse.SUPPRESS)
+    return op
+
+
 def rename(*args):
     """Rename a notebook."""
-    op = optparse.OptionParser(usage='%prog rename [options] OLD_NAME ' +
-                                     'NEW_NAME',
-                               version=__version__,
-                               description=rename.__doc__)
-    op.add_option('-v', '--verbose', default=False, action='store_true',
-                  help='be verbose')
+    op = _rename_parser()
     if len(args) == 0:
         args = ['--help']
-    opts, posargs = op.parse_args(args=list(args))
+    opts, posargs = parse_args(op, args)
     if len(posargs) != 2:
         print('lnote rename: wrong number of parameters, ' +
               'expecting exactly two (old and new notebook name)', file=sys.stderr)
     old, new = posargs
 
     # check if notebook exists
-    if old not in os.listdir(LNOTE_DIR):
+    if not os.path.isdir(os.path.join(LNOTE_DIR, old)):
         print(f'lnote rename: cannot rename "{old}": no such file', file=sys.stderr)
         sys.exit(1)
 
     # check if notebook with that name already exists
-    if new in os.listdir(LNOTE_DIR):
+    if os.path.lexists(os.path.join(LNOTE_DIR, new)):
         print(f'lnote rename: cannot rename notebook to "{new}": file exists', file=sys.stderr)
         sys.exit(1)
 
     # rename notebook
     olddir = os.path.join(LNOTE_DIR, old)
     newdir = os.path.join(LNOTE_DIR, new)
-    os.rename(olddir, newdir)
+    os.replace(olddir, newdir)
+    invalidate_notebooks()
     if opts.verbose:
         print(f'mv {olddir} {newdir}')
-    oldtex = os.path.join(LNOTE_DIR, new, old + '.tex')
-    newtex = os.path.join(LNOTE_DIR, new, new + '.tex')
-    os.rename(oldtex, newtex)
+    oldtex = os.path.join(newdir, old + '.tex')
+    newtex = os.path.join(newdir, new + '.tex')
+    os.replace(oldtex, newtex)
     if opts.verbose:
         print(f'mv {oldtex} {newtex}')
 
 
+@lru_cache(maxsize=None)
+def _merge_parser():
+    """Return the option parser of merge()."""
+    op = argparse.ArgumentParser(usage='%(prog)s merge [options] ' +
+                                       'SOURCE_NOTEBOOKS TARGET_NOTEBOOK',
+                                 description=merge.__doc__)
+    op.add_argument('--version', action='version', version=__version__)
+    op.add_argument('-v', '--verbose', default=False, action='store_true',
+                    help='be verbose')
+    op.add_argument('-d', '--date', default=False, action='store_true',
+                    help='show date of notebooks as marginal notes')
+    op.add_argument('posargs', nargs='*', help=argparse.SUPPRESS)
+    return op
+
+
 def merge(*args):
     """Merge several notebooks into another (append all source notebooks to the
     target notebook). If the target notebook does not exist, create it."""
-    op = optparse.OptionParser(usage='%prog merge [options] ' +
-                                     'SOURCE_NOTEBOOKS TARGET_NOTEBOOK',
-                               version=__version__,
-                               description=merge.__doc__)
-    op.add_option('-v', '--verbose', default=False, action='store_true',
-                  help='be verbose')
-    op.add_option('-d', '--date', default=False, action='store_true',
-                  help='show date of notebooks as marginal notes')
+    op = _merge_parser()
     if len(args) == 0:
         args = ['--help']
-    opts, posargs = op.parse_args(args=list(args))
+    opts, posargs = parse_args(op, args)
     notebooks = select_notebooks(*posargs[:-1])
     new = select_notebook(posargs[-1], forgiving=True)
 
     # check if all notebooks exist
     for notebook in notebooks:
-        if notebook not in os.listdir(LNOTE_DIR):
-            print('lnote merge: cannot load notebook "{notebook}": no such file', file=sys.stderr)
+        if not os.path.isdir(os.path.join(LNOTE_DIR, notebook)):
+            print(f'lnote merge: cannot load notebook "{notebook}": no such file', file=sys.stderr)
             sys.exit(1)
 
     # merge notebooks
-    for notebook in notebooks:
-        # load tex-file of source notebook and append it to target notebook
-        with open(texpath(notebook), 'r') as f:
-            lines = f.readlines()
-        linebreak('--notebook', new)
-        if opts.date:
-            marginnote('--notebook', new, '\\texttt{%s}' % notebook)
-        append_text(new, ''.join(lines).strip())
-        if opts.verbose:
-            print(f'cat {texpath(notebook)} >> {texpath(new)}')
+    with open(texpath(new), 'ab') as out:
+        for notebook in notebooks:
+            # stream tex-file of source notebook into target notebook
+            out.write(b'\n')
+            if opts.date:
+                out.write(b'\\marginpar{\\texttt{%s}}\n' % notebook.encode())
+            with open(texpath(notebook), 'rb') as src:
+                # only copy what is there now, source and target may be the same
+                copy_stripped(src, out, os.fstat(src.fileno()).st_size)
+            out.write(b'\n')
+            if opts.verbose:
+                print(f'cat {texpath(notebook)} >> {texpath(new)}')
+
+            # copy all other files from the source notebook
+            with os.scandir(os.path.join(LNOTE_DIR, notebook)) as entries:
+                for entry in entries:
+                    if entry.name == notebook + '.tex' or not entry.is_file():
+                        continue
+                    dst = os.path.join(LNOTE_DIR, new, entry.name)
+                    shutil.copyfile(entry.path, dst)
+                    if opts.verbose:
+                        print(f'cp {entry.path} {dst}')
+
 
-        # copy all other files from the source notebook
-        for filename in os.listdir(os.path.join(LNOTE_DIR, notebook)):
-            if filename != notebook + '.tex':
-                src = os.path.join(LNOTE_DIR, notebook, filename)
-                dst = os.path.join(LNOTE_DIR, new)
-                shutil.copy(src, dst)
-                if opts.verbose:
-                    print('cp {src} {dst}')
+@lru_cache(maxsize=None)
+def _edit_parser():
+    """Return the option parser of edit()."""
+    op = argparse.ArgumentParser(usage='%(prog)s edit [options] NOTEBOOK ' +
+                                       '[NOTEBOOK2 NOTEBOOK3 ...]',
+                                 description=edit.__doc__)
+    op.add_argument('--version', action='version', version=__version__)
+    op.add_argument('-e', '--editor',
+                    default=os.environ.get('LNOTE_EDITOR', 'vim'),
+                    help='set editor. Default can be overwritten with ' +
+                         'environment variable LNOTE_EDITOR')
+    op.add_argument('posargs', nargs='*', help=argparse.SUPPRESS)
+    return op
 
 
 def edit(*args):
     """Open notebook in a text editor. If multiple notebooks are given, open
     them side by side."""
-    op = optparse.OptionParser(usage='%prog edit [options] NOTEBOOK ' +
-                                     '[NOTEBOOK2 NOTEBOOK3 ...]',
-                               version=__version__,
-                               description=edit.__doc__)
-    op.add_option('-e', '--editor',
-                  default=os.environ.get('LNOTE_EDITOR', 'vim'),
-                  help='set editor. Default can be overwritten with ' +
-                       'environment variable LNOTE_EDITOR')
-    opts, posargs = op.parse_args(args=list(args))
+    op = _edit_parser()
+    opts, posargs = parse_args(op, args)
     if len(posargs) == 0:
-        posargs = [date2filename(*jdn2greg(opt2day('today')))]
+        posargs = [date2filename(*_today_ymd()[:3])]
 
     # select notebooks
     notebooks = select_notebooks(*posargs, unique=True)
@@ -254,23 +313,31 @@ def edit(*args):
     paths = [texpath(notebook) for notebook in notebooks]
     subprocess.call([opts.editor] + paths, stderr=subprocess.STDOUT,
                     stdout=None if opts.editor in ('vi', 'vim')
-                    else open('/dev/null', 'w'))
+                    else subprocess.DEVNULL)
+
+
+@lru_cache(maxsize=None)
+def _delete_parser():
+    """Return the option parser of delete()."""
+    op = argparse.ArgumentParser(usage='%(prog)s delete [options] NOTEBOOK ' +
+                                       '[NOTEBOOK2 NOTEBOOK3 ...]',
+                                 description=delete.__doc__)
+    op.add_argument('--version', action='version', version=__version__)
+    op.add_argument('-n', '--notebook', default=None, help='select notebook')
+    op.add_argument('-f', '--force', default=False, action='store_true',
+                    help='ignore nonexistent notebooks, never prompt')
+    op.add_argument('-t', '--test', default=False, action='store_true',
+                    help='test mode, only show what would have been deleted')
+    op.add_argument('posargs', nargs='*', help=argparse.SUPPRESS)
+    return op
 
 
 def delete(*args):
     """Delete a notebook."""
-    op = optparse.OptionParser(usage='%prog delete [options] NOTEBOOK ' +
-                                     '[NOTEBOOK2 NOTEBOOK3 ...]',
-                               version=__version__,
-                               description=delete.__doc__)
-    op.add_option('-n', '--notebook', default=None, help='select notebook')
-    op.add_option('-f', '--force', default=False, action='store_true',
-                  help='ignore nonexistent notebooks, never prompt')
-    op.add_option('-t', '--test', default=False, action='store_true',
-                  help='test mode, only show what would have been deleted')
+    op = _delete_parser()
     if len(args) == 0:
         args = ['--help']
-    opts, posargs = op.parse_args(args=list(args))
+    opts, posargs = parse_args(op, args)
 
     # select notebooks
     try:
@@ -293,35 +360,50 @@ def delete(*args):
         if opts.test:
             print(f'would have deleted "{notebook}"')
         else:
-            shutil.rmtree(os.path.join(LNOTE_DIR, notebook))
+            remove_tree(dirpath(notebook), ignore_errors=opts.force)
+            invalidate_notebooks()
+
+
+@lru_cache(maxsize=None)
+def _export_parser():
+    """Return the option parser of export()."""
+    op = argparse.ArgumentParser(usage='%(prog)s export [options] ' +
+                                       '[PATTERN [PATTERN2 PATTERN3 ...]] ' +
+                                       'OUTPUT_FILE',
+                                 description=export.__doc__)
+    op.add_argument('--version', action='version', version=__version__)
+    op.add_argument('-m', '--export-merge', dest='mergetemp',
+                    default='temp-export-merge',
+                    help='set temporary notebook name that is used to merge ' +
+                         'the selected notebooks')
+    op.add_argument('-c', '--export-compile', dest='compiletemp',
+                    default='/tmp/export-compile',
+                    help='set temporary directory that is used to compile the ' +
+                         'LaTeX file of the merged notebook')
+    op.add_argument('-v', '--verbose', default=False, action='store_true',
+                    help='be verbose, print compiler messages')
+    op.add_argument('-d', '--date', default=False, action='store_true',
+                    help='show date of notebooks as marginal notes')
+    op.add_argument('--no-cache', dest='nocache', default=False,
+                    action='store_true',
+                    help='always compile, do not reuse a PDF file compiled ' +
+                         'earlier from unchanged notebooks')
+    op.add_argument('posargs', nargs='*', help=argparse.SUPPRESS)
+    return op
 
 
 def export(*args):
     """Export a notebook or selection of notebooks (for now only to PDF
     format)."""
 
-    op = optparse.OptionParser(usage='%prog export [options] ' +
-                                     '[PATTERN [PATTERN2 PATTERN3 ...]] ' +
-                                     'OUTPUT_FILE',
-                               version=__version__,
-                               description=export.__doc__)
-    op.add_option('-m', '--export-merge', dest='mergetemp',
-                  default='temp-export-merge',
-                  help='set temporary notebook name that is used to merge ' +
-                       'the selected notebooks')
-    op.add_option('-c', '--export-compile', dest='compiletemp',
-                  default='/tmp/export-compile',
-                  help='set temporary directory that is used to compile the ' +
-                       'LaTeX file of the merged notebook')
-    op.add_option('-v', '--verbose', default=False, action='store_true',
-                  help='be verbose, print compiler messages')
-    op.add_option('-d', '--date', default=False, action='store_true',
-                  help='show date of notebooks as marginal notes')
+    op = _export_parser()
     if len(args) == 0:
         args = ['--help']
-    opts, posargs = op.parse_args(args=list(args))
+    opts, posargs = parse_args(op, args)
     if len(posargs) == 1:
-        posargs = ['today', posargs[0]]
+        # select today's notebook (if it exists)
+        today = date2filename(*_today_ymd()[:3])
+        posargs = ([today] if today in list_notebooks() else []) + posargs
 
     # select notebooks
     notebooks = select_notebooks(*posargs[:-1])
@@ -334,6 +416,20 @@ def export(*args):
     if '.' not in target:
         target += '.pdf'
 
+    # reuse the PDF file compiled earlier if no notebook has changed since
+    cachefile = os.path.join(opts.compiletemp, 'cache',
+                             export_key(notebooks, opts.date) + '.pdf')
+    if not opts.nocache:
+        try:
+            shutil.copyfile(cachefile, target)
+        except OSError:
+            pass
+        else:
+            if opts.verbose:
+                print('lnote export: nothing changed, using cached PDF file ' +
+                      '(use --no-cache to compile anyway)')
+            return
+
     # merge notebooks into temporary notebook
     delete(opts.mergetemp, '--force')
     mergeargs = notebooks + [opts.mergetemp]
@@ -352,43 +448,70 @@ def export(*args):
             shutil.copy(src, opts.compiletemp)
 
     # add LaTeX preample and epilog to the tex-file and copy it over
-    preamble = r'\\documentclass{scrartcl}\\n' + \
-               r'\\usepackage{amsmath}\n\\usepackage{amsthm}\n' + \
-               r'\\usepackage{graphicx}\n\\usepackage{commath}\n' + \
-               r'\\begin{document}\\n\\n'
-    epilog = r'\\end{document}'
-    with open(texpath(opts.mergetemp), 'r') as f:
-        lines = f.readlines()
-    with open(os.path.join(opts.compiletemp, opts.mergetemp+'.tex'), 'w') as f:
-        f.write(preamble.strip()+'\n')
-        f.write(''.join(lines).strip()+'\n')
-        f.write(epilog+'\n')
-
-    # use pdflatex to compile PDF document
-    cdcmd = 'cd %s' % opts.compiletemp
-    latexcmd = 'pdflatex %s' % opts.mergetemp + '.tex'
-    #os.system('%s;%s' % (cdcmd, latexcmd))
-    subprocess.call(f'{cdcmd};{latexcmd}', shell=True,
-                    stderr=None if opts.verbose else subprocess.STDOUT,
-                    stdout=None if opts.verbose else open('/dev/null', 'w'))
+    with open(os.path.join(opts.compiletemp, opts.mergetemp+'.tex'), 'wb') as out:
+        out.write(_PREAMBLE)
+        with open(texpath(opts.mergetemp), 'rb') as src:
+            copy_stripped(src, out)
+        out.write(b'\n')
+        out.write(_EPILOG)
+
+    # use pdflatex to compile PDF document, do not leave an old one behind
+    pdffile = os.path.join(opts.compiletemp, opts.mergetemp+'.pdf')
+    if os.path.exists(pdffile):
+        os.remove(pdffile)
     try:
-        shutil.copyfile(os.path.join(opts.compiletemp, opts.mergetemp+'.pdf'), target)
-    except IOError:
+        latex = subprocess.run(['pdflatex', '-interaction=nonstopmode',
+                                opts.mergetemp + '.tex'],
+                               cwd=opts.compiletemp,
+                               stderr=None if opts.verbose else subprocess.DEVNULL,
+                               stdout=None if opts.verbose else subprocess.DEVNULL)
+        shutil.copyfile(pdffile, target)
+    except OSError as e:
+        if opts.verbose:
+            print(f'lnote export: {e}', file=sys.stderr)
         print('lnote export: export failed' +
             ('' if opts.verbose else ', use --verbose to get details'), file=sys.stderr)
+        return
+
+    # keep a copy for later exports of the same notebooks, unless there were
+    # errors (pdflatex may still produce a PDF file then). Only the newest PDF
+    # file is kept, older ones would pile up with every change
+    if latex.returncode != 0:
+        return
+    cachedir = os.path.dirname(cachefile)
+    os.makedirs(cachedir, exist_ok=True)
+    with os.scandir(cachedir) as entries:
+        for entry in entries:
+            if entry.name.endswith('.pdf'):
+                try:
+                    os.unlink(entry.path)
+                except OSError:
+                    pass
+    shutil.copyfile(pdffile, cachefile)
+
+
+@lru_cache(maxsize=None)
+def _path_parser():
+    """Return the option parser of path()."""
+    op = argparse.ArgumentParser(usage='%(prog)s path [options] NOTEBOOK ' +
+                                       '[NOTEBOOK2 NOTEBOOK3 ...]',
+                                 description=view.__doc__)
+    op.add_argument('--version', action='version', version=__version__)
+    op.add_argument('-t', '--tex', default=False, action='store_true',
+                    help='get path of the tex file instead of the directory')
+    op.add_argument('posargs', nargs='*', help=argparse.SUPPRESS)
+    return op
 
 
 def path(*args):
     """Get path of the directory of a certain notebook.
     """
-    op = optparse.OptionParser(usage='%prog path [options] NOTEBOOK ' +
-                                     '[NOTEBOOK2 NOTEBOOK3 ...]',
-                               version=__version__, description=view.__doc__)
-    op.add_option('-t', '--tex', default=False, action='store_true',
-                  help='get path of the tex file instead of the directory')
-    opts, posargs = op.parse_args(args=list(args))
+    op = _path_parser()
+    opts, posargs = parse_args(op, args)
     if len(posargs) == 0:
-        posargs = ['today']
+        # select today's notebook (if it exists)
+        today = date2filename(*_today_ymd()[:3])
+        posargs = [today] if today in list_notebooks() else []
 
     # select notebooks
     notebooks = select_notebooks(*posargs)
@@ -404,33 +527,47 @@ def path(*args):
             print(dirpath(notebook))
 
 
+@lru_cache(maxsize=None)
+def _view_parser():
+    """Return the option parser of view()."""
+    op = argparse.ArgumentParser(usage='%(prog)s view [options] NOTEBOOK ' +
+                                       '[NOTEBOOK2 NOTEBOOK3 ...]',
+                                 description=view.__doc__)
+    op.add_argument('--version', action='version', version=__version__)
+    op.add_argument('-e', '--export', default=False, action='store_true',
+                    help='view exported version (for now only PDF)')
+    op.add_argument('-p', '--pdfviewer',
+                    default=os.environ.get('LNOTE_PDFVIEWER', 'okular'),
+                    help='set PDF viewer. Default can be overwritten with ' +
+                         'environment variable LNOTE_PDFVIEWER')
+    op.add_argument('-m', '--view-merge', dest='mergetemp',
+                    default='temp-view-merge',
+                    help='set temporary notebook name that is used to merge ' +
+                         'the selected notebooks')
+    op.add_argument('-c', '--view-compile', dest='compiletemp',
+                    default='/tmp/view-compile',
+                    help='set temporary directory that is used to compile the ' +
+                         'LaTeX file of the merged notebook')
+    op.add_argument('-v', '--verbose', default=False, action='store_true',
+                    help='be verbose, print compiler messages')
+    op.add_argument('-d', '--date', default=False, action='store_true',
+                    help='show date of notebooks as marginal notes')
+    op.add_argument('--no-cache', dest='nocache', default=False,
+                    action='store_true',
+                    help='always compile, do not reuse a PDF file compiled ' +
+                         'earlier from unchanged notebooks')
+    op.add_argument('posargs', nargs='*', help=argparse.SUPPRESS)
+    return op
+
+
 def view(*args):
     """View a notebook or a selection of notebooks."""
-    op = optparse.OptionParser(usage='%prog view [options] NOTEBOOK ' +
-                                     '[NOTEBOOK2 NOTEBOOK3 ...]',
-                               version=__version__, description=view.__doc__)
-    op.add_option('-e', '--export', default=False, action='store_true',
-                  help='view exported version (for now only PDF)')
-    op.add_option('-p', '--pdfviewer',
-                  default=os.environ.get('LNOTE_PDFVIEWER', 'okular'),
-                  help='set PDF viewer. Default can be overwritten with ' +
-                       'environment variable LNOTE_PDFVIEWER')
-    op.add_option('-m', '--view-merge', dest='mergetemp',
-                  default='temp-view-merge',
-                  help='set temporary notebook name that is used to merge ' +
-                       'the selected notebooks')
-    op.add_option('-c', '--view-compile', dest='compiletemp',
-                  default='/tmp/view-compile',
-                  help='set temporary directory that is used to compile the ' +
-                       'LaTeX file of the merged notebook')
-    op.add_option('-v', '--verbose', default=False, action='store_true',
-                  help='be verbose, print compiler messages')
-    op.add_option('-d', '--date', default=False, action='store_true',
-                  help='show date of notebooks as marginal notes')
-
-    opts, posargs = op.parse_args(args=list(args))
+    op = _view_parser()
+    opts, posargs = parse_args(op, args)
     if len(posargs) == 0:
-        posargs = ['today']
+        # select today's notebook (if it exists)
+        today = date2filename(*_today_ymd()[:3])
+        posargs = [today] if today in list_notebooks() else []
 
     # select notebooks
     notebooks = select_notebooks(*posargs)
@@ -447,20 +584,24 @@ def view(*args):
             exportargs.append('--verbose')
         if opts.date:
             exportargs.append('--date')
+        if opts.nocache:
+            exportargs.append('--no-cache')
         export(*exportargs)
 
         # open the PDF file in a PDF viewer (if not already open)
-        lines = subprocess.check_output('ps aux',
-                                        shell=True).strip().splitlines()
-        for line in lines:
-            if opts.pdfviewer in line and pdffile in line:
-                if opts.verbose:
-                    print(f'lnote view: document still open in PID {line.split()[1]}')
-                break
+        pid = find_process(shlex.split(opts.pdfviewer)[0], pdffile)
+        if pid is not None:
+            if opts.verbose:
+                print(f'lnote view: document still open in PID {pid}')
         else:
-            subprocess.call(f'{opts.pdfviewer} {pdffile} &', shell=True,
-                            stderr=None if opts.verbose else subprocess.STDOUT,
-                            stdout=None if opts.verbose else open('/dev/null', 'w'))
+            try:
+                subprocess.Popen(shlex.split(opts.pdfviewer) + [pdffile],
+                                 start_new_session=True,
+                                 stderr=None if opts.verbose else subprocess.DEVNULL,
+                                 stdout=None if opts.verbose else subprocess.DEVNULL)
+            except OSError as e:
+                print(f'lnote view: cannot start PDF viewer: {e}', file=sys.stderr)
+                sys.exit(1)
     else:
         # merge notebooks into temporary notebook and display the tex-file
         delete(opts.mergetemp, '--force')
@@ -468,13 +609,24 @@ def view(*args):
         if opts.date:
             mergeargs.append('--date')
         merge(*mergeargs)
-        with open(texpath(opts.mergetemp), 'r') as f:
-            text = ''.join(f.readlines())
-            if text[0] == '\n':
-                text = text[1:]
-            if text[-1] == '\n':
-                text = text[:-1]
-            print(text)
+        with open(texpath(opts.mergetemp)) as f:
+            text = f.read()
+        print(text.removeprefix('\n').removesuffix('\n'))
+
+
+@lru_cache(maxsize=None)
+def _text_parser():
+  """Return the option parser of text()."""
+  op = argparse.ArgumentParser(usage='%(prog)s text [options] TEXT...',
+                               description=text.__doc__)
+  op.add_argument('--version', action='version', version=__version__)
+  op.add_argument('-n', '--notebook', default=None, help='select notebook')
+  op.add_argument('-f', '--file', default=None,
+                  help='read text from the given text file')
+  op.add_argument('-i', '--stdin', default=False, action='store_true',
+                  help='read text from standard input')
+  op.add_argument('posargs', nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+  return op
 
 
 def text(*args):
@@ -482,17 +634,10 @@ def text(*args):
 
   If the selected notebook does not exist, it is created. By default, today's
   notebook is used."""
-  op = optparse.OptionParser(usage='%prog text [options] TEXT...',
-                             version=__version__, description=text.__doc__)
-  op.add_option('-n', '--notebook', default=None, help='select notebook')
-  op.add_option('-f', '--file', default=None,
-                help='read text from the given text file')
-  op.add_option('-i', '--stdin', default=False, action='store_true',
-                help='read text from standard input')
+  op = _text_parser()
   if len(args) == 0:
     args = ['--help']
-  op.allow_interspersed_args = False
-  opts, posargs = op.parse_args(args=list(args))
+  opts, posargs = parse_args(op, args, intermixed=False)
 
   # select notebook
   try:
@@ -501,17 +646,32 @@ def text(*args):
     print(f'lnote text: notebook not found: {opts.notebook}', file=sys.stderr)
     sys.exit(1)
 
-  # append text from command line arguments
-  append_text(notebook, ' '.join(posargs))
+  with NotebookWriter(notebook) as writer:
+    # append text from command line arguments
+    writer.append(' '.join(posargs))
 
-  # append text from the given text file
-  if opts.file:
-    append_text(notebook, open(opts.file, 'r').read())
+    # append text from the given text file
+    if opts.file:
+      with open(opts.file) as f:
+        writer.append(f.read())
 
-  # read text from standard input
-  if opts.stdin:
-    stdin = sys.stdin.read().strip()
-    append_text(notebook, stdin)
+    # read text from standard input
+    if opts.stdin:
+      stdin = sys.stdin.read().strip()
+      writer.append(stdin)
+
+
+@lru_cache(maxsize=None)
+def _linebreak_parser():
+  """Return the option parser of linebreak()."""
+  op = argparse.ArgumentParser(usage='%(prog)s linebreak [options]',
+                               description=linebreak.__doc__)
+  op.add_argument('--version', action='version', version=__version__)
+  op.add_argument('-n', '--notebook', default=None, help='select notebook')
+  op.add_argument('-#', '--number', default=1, type=int,
+                  help='set number of linebreaks')
+  op.add_argument('posargs', nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+  return op
 
 
 def linebreak(*args):
@@ -519,14 +679,8 @@ def linebreak(*args):
 
   If the selected notebook does not exist, it is created. By default, today's
   notebook is used."""
-  op = optparse.OptionParser(usage='%prog linebreak [options]',
-                             version=__version__,
-                             description=linebreak.__doc__)
-  op.add_option('-n', '--notebook', default=None, help='select notebook')
-  op.add_option('-#', '--number', default=1, type=int,
-                help='set number of linebreaks')
-  op.allow_interspersed_args = False
-  opts, posargs = op.parse_args(args=list(args))
+  op = _linebreak_parser()
+  opts, posargs = parse_args(op, args, intermixed=False)
   if len(posargs) != 0:
     print('lnote linebreak: not expecting any positional parameters', file=sys.stderr)
     sys.exit(1)
@@ -538,8 +692,21 @@ def linebreak(*args):
   notebook = select_notebook(opts.notebook)
 
   # append empty lines
-  for i in range(opts.number):
-    append_text(notebook, '\n')
+  append_texts(notebook, *['\n'] * opts.number)
+
+
+@lru_cache(maxsize=None)
+def _section_parser():
+  """Return the option parser of section()."""
+  op = argparse.ArgumentParser(usage='%(prog)s section [options] TITLE...',
+                               description=section.__doc__)
+  op.add_argument('--version', action='version', version=__version__)
+  op.add_argument('-n', '--notebook', default=None, help='select notebook')
+  op.add_argument('-l', '--level', default=1, type=int, help='set level')
+  op.add_argument('-#', '--numbered', default=False, action='store_true',
+                  help='add numbered section')
+  op.add_argument('posargs', nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+  return op
 
 
 def section(*args):
@@ -547,15 +714,8 @@ def section(*args):
 
   If the selected notebook does not exist, it is created. By default, today's
   notebook is used."""
-  op = optparse.OptionParser(usage='%prog section [options] TITLE...',
-                             version=__version__,
-                             description=section.__doc__)
-  op.add_option('-n', '--notebook', default=None, help='select notebook')
-  op.add_option('-l', '--level', default=1, type=int, help='set level')
-  op.add_option('-#', '--numbered', default=False, action='store_true',
-                help='add numbered section')
-  op.allow_interspersed_args = False
-  opts, posargs = op.parse_args(args=list(args))
+  op = _section_parser()
+  opts, posargs = parse_args(op, args, intermixed=False)
 
   # determine section level
   if opts.level == 1:
@@ -576,8 +736,19 @@ def section(*args):
 
   # add the section
   title = ' '.join(posargs)
-  linebreak('--notebook', notebook) #'--number', '3'
-  text('--notebook', notebook, '\%s{%s}' % (texcmd, title))
+  append_texts(notebook, '\n', '\\%s{%s}' % (texcmd, title))
+
+
+@lru_cache(maxsize=None)
+def _paragraph_parser():
+  """Return the option parser of paragraph()."""
+  op = argparse.ArgumentParser(usage='%(prog)s paragraph [options] TITLE...',
+                               description=paragraph.__doc__)
+  op.add_argument('--version', action='version', version=__version__)
+  op.add_argument('-n', '--notebook', default=None, help='select notebook')
+  op.add_argument('-l', '--level', default=1, type=int, help='set level')
+  op.add_argument('posargs', nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+  return op
 
 
 def paragraph(*args):
@@ -585,13 +756,8 @@ def paragraph(*args):
 
   If the selected notebook does not exist, it is created. By default, today's
   notebook is used."""
-  op = optparse.OptionParser(usage='%prog paragraph [options] TITLE...',
-                             version=__version__,
-                             description=paragraph.__doc__)
-  op.add_option('-n', '--notebook', default=None, help='select notebook')
-  op.add_option('-l', '--level', default=1, type=int, help='set level')
-  op.allow_interspersed_args = False
-  opts, posargs = op.parse_args(args=list(args))
+  op = _paragraph_parser()
+  opts, posargs = parse_args(op, args, intermixed=False)
 
   # determine section level
   if opts.level == 1:
@@ -606,8 +772,21 @@ def paragraph(*args):
 
   # add the paragraph
   title = ' '.join(posargs)
-  linebreak('--notebook', notebook)
-  text('--notebook', notebook, '\%s{%s}' % (texcmd, title))
+  append_texts(notebook, '\n', '\\%s{%s}' % (texcmd, title))
+
+
+@lru_cache(maxsize=None)
+def _equation_parser():
+  """Return the option parser of equation()."""
+  op = argparse.ArgumentParser(usage='%(prog)s equation [options] TITLE...',
+                               description=equation.__doc__)
+  op.add_argument('--version', action='version', version=__version__)
+  op.add_argument('-n', '--notebook', default=None, help='select notebook')
+  op.add_argument('-#', '--numbered', default=False, action='store_true',
+                  help='add numbered equation')
+  op.add_argument('-l', '--label', default='', help='set label')
+  op.add_argument('posargs', nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+  return op
 
 
 def equation(*args):
@@ -615,15 +794,8 @@ def equation(*args):
 
   If the selected notebook does not exist, it is created. By default, today's
   notebook is used."""
-  op = optparse.OptionParser(usage='%prog equation [options] TITLE...',
-                             version=__version__,
-                             description=equation.__doc__)
-  op.add_option('-n', '--notebook', default=None, help='select notebook')
-  op.add_option('-#', '--numbered', default=False, action='store_true',
-                help='add numbered equation')
-  op.add_option('-l', '--label', default='', help='set label')
-  op.allow_interspersed_args = False
-  opts, posargs = op.parse_args(args=list(args))
+  op = _equation_parser()
+  opts, posargs = parse_args(op, args, intermixed=False)
 
   # select notebook
   notebook = select_notebook(opts.notebook)
@@ -631,11 +803,24 @@ def equation(*args):
   # add the equation
   eq = ' '.join(posargs)
   s = '' if opts.numbered else '*'
-  text('--notebook', notebook, '\\begin{equation%s}' % s)
-  text('--notebook', notebook, eq)
+  lines = ['\\begin{equation%s}' % s, eq]
   if opts.label:
-    text('--notebook', notebook, '\label{%s}' % opts.label)
-  text('--notebook', notebook, '\\end{equation%s}' % s)
+    lines.append('\\label{%s}' % opts.label)
+  lines.append('\\end{equation%s}' % s)
+  append_texts(notebook, *lines)
+
+
+@lru_cache(maxsize=None)
+def _figure_parser():
+  """Return the option parser of figure()."""
+  op = argparse.ArgumentParser(usage='%(prog)s figure [options] TITLE...',
+                               description=figure.__doc__)
+  op.add_argument('--version', action='version', version=__version__)
+  op.add_argument('-n', '--notebook', default=None, help='select notebook')
+  op.add_argument('-c', '--caption', default='', help='set caption')
+  op.add_argument('-l', '--label', default='', help='set label')
+  op.add_argument('posargs', nargs='*', help=argparse.SUPPRESS)
+  return op
 
 
 def figure(*args):
@@ -643,13 +828,8 @@ def figure(*args):
 
   If the selected notebook does not exist, it is created. By default, today's
   notebook is used."""
-  op = optparse.OptionParser(usage='%prog figure [options] TITLE...',
-                             version=__version__,
-                             description=figure.__doc__)
-  op.add_option('-n', '--notebook', default=None, help='select notebook')
-  op.add_option('-c', '--caption', default='', help='set caption')
-  op.add_option('-l', '--label', default='', help='set label')
-  opts, posargs = op.parse_args(args=list(args))
+  op = _figure_parser()
+  opts, posargs = parse_args(op, args)
 
   # select notebook
   notebook = select_notebook(opts.notebook)
@@ -660,26 +840,49 @@ def figure(*args):
       print(f'lnote figure: cannot copy {graphicsfile}: no such file', file=sys.stderr)
       sys.exit(1)
 
+  # copy the graphics files into the notebook directory, several files in
+  # parallel as copying is I/O bound (if two files have the same name, the
+  # last one wins)
+  copies = {os.path.join(dirpath(notebook), os.path.basename(graphicsfile)):
+            graphicsfile for graphicsfile in posargs}
+  if len(copies) > 1:
+    from concurrent.futures import ThreadPoolExecutor  # slow to import
+    with ThreadPoolExecutor(max_workers=min(8, len(copies))) as pool:
+      list(pool.map(shutil.copyfile, copies.values(), copies.keys()))
+  else:
+    for dst, src in copies.items():
+      shutil.copyfile(src, dst)
+
   # add the figure
-  linebreak('--notebook', notebook)
-  text('--notebook', notebook, '\\begin{figure}')
-  text('--notebook', notebook, '\centering')
+  lines = ['\n', '\\begin{figure}', '\\centering']
   for graphicsfile in posargs:
-    # copy the graphics file into the notebook directory
-    shutil.copy(graphicsfile, os.path.join(LNOTE_DIR, notebook))
-
-    # add graphics file
-    text('--notebook', notebook, '\includegraphics[width=.72\\textwidth]{%s}'\
-                                 % os.path.basename(graphicsfile))
+    lines.append('\\includegraphics[width=.72\\textwidth]{%s}'
+                 % os.path.basename(graphicsfile))
   if opts.caption:
-    text('--notebook', notebook, '\caption{%s}' % opts.caption)
+    lines.append('\\caption{%s}' % opts.caption)
   if opts.label:
-    text('--notebook', notebook, '\label{%s}' % opts.label)
+    lines.append('\\label{%s}' % opts.label)
   else:
     if len(posargs) == 1:
-      text('--notebook', notebook,
-           '\label{%s}' % os.path.basename(posargs[0]).rsplit('.', 1)[0])
-  text('--notebook', notebook, '\\end{figure}')
+      lines.append('\\label{%s}'
+                   % os.path.basename(posargs[0]).rsplit('.', 1)[0])
+  lines.append('\\end{figure}')
+  append_texts(notebook, *lines)
+
+
+@lru_cache(maxsize=None)
+def _prune_parser():
+  """Return the option parser of prune()."""
+  op = argparse.ArgumentParser(usage='%(prog)s prune [options]',
+                               description=prune.__doc__)
+  op.add_argument('--version', action='version', version=__version__)
+  op.add_argument('-n', '--notebook', default=None, help='select notebook')
+  op.add_argument('-#', '--number', default=1, type=int,
+                  help='set number of lines to remove')
+  op.add_argument('-f', '--force', default=False, action='store_true',
+                  help='never prompt')
+  op.add_argument('posargs', nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+  return op
 
 
 def prune(*args):
@@ -687,16 +890,8 @@ def prune(*args):
 
   If the selected notebook does not exist, it is created. By default, today's
   notebook is used."""
-  op = optparse.OptionParser(usage='%prog prune [options]',
-                             version=__version__,
-                             description=prune.__doc__)
-  op.add_option('-n', '--notebook', default=None, help='select notebook')
-  op.add_option('-#', '--number', default=1, type=int,
-                help='set number of lines to remove')
-  op.add_option('-f', '--force', default=False, action='store_true',
-                help='never prompt')
-  op.allow_interspersed_args = False
-  opts, posargs = op.parse_args(args=list(args))
+  op = _prune_parser()
+  opts, posargs = parse_args(op, args, intermixed=False)
   if len(posargs) != 0:
     print('lnote prune: not expecting any positional parameters', file=sys.stderr)
     sys.exit(1)
@@ -708,28 +903,39 @@ def prune(*args):
   # select notebook
   notebook = select_notebook(opts.notebook)
 
-  # copy the whole file, but leave out the last couple of lines
-  with open(texpath(notebook), 'r') as f:
-    lines = f.readlines()
-  if len(lines[-opts.number:]) == 0:
-    return
+  with open(texpath(notebook), 'rb+') as f:
+    # only read the last couple of lines from the end of the file
+    offset, tail = read_tail(f, opts.number)
+    if len(tail) == 0:
+      return
 
-  # prompt
-  if not opts.force:
-    # print the lines
-    select = ''.join(lines[-opts.number:]) #.strip()
-    sys.stdout.write('\033[7m%s\033[0m' % select)
+    # prompt
+    if not opts.force:
+      # print the lines
+      select = tail.decode()
+      sys.stdout.write('\033[7m%s\033[0m' % select)
+
+      message = 'remove the above line%s from notebook "%s"? ' \
+                % (plural(opts.number), notebook)
+      answer = input(message).lower()
+      if not answer or not 'yes'.startswith(answer):
+        return
+
+    # cut off the last couple of lines
+    f.truncate(offset)
 
-    message = 'remove the above line%s from notebook "%s"? ' \
-              % (plural(opts.number), notebook)
-    answer = input(message).lower()
-    if not answer or not 'yes'.startswith(answer):
-      return
 
-  # overwrite tex-file, leave out the last couple of lines
-  with open(texpath(notebook), 'w') as f:
-    for line in lines[:-opts.number]:
-      f.write(line)
+@lru_cache(maxsize=None)
+def _item_parser():
+  """Return the option parser of item()."""
+  op = argparse.ArgumentParser(usage='%(prog)s item [options] TEXT...',
+                               description=item.__doc__)
+  op.add_argument('--version', action='version', version=__version__)
+  op.add_argument('-n', '--notebook', default=None, help='select notebook')
+  op.add_argument('-t', '--type', default='itemize', help='set list type')
+  op.add_argument('-l', '--label', default=None, type=str, help='set label')
+  op.add_argument('posargs', nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+  return op
 
 
 def item(*args):
@@ -738,13 +944,8 @@ def item(*args):
 
   If the selected notebook does not exist, it is created. By default, today's
   notebook is used."""
-  op = optparse.OptionParser(usage='%prog item [options] TEXT...',
-                             version=__version__, description=item.__doc__)
-  op.add_option('-n', '--notebook', default=None, help='select notebook')
-  op.add_option('-t', '--type', default='itemize', help='set list type')
-  op.add_option('-l', '--label', default=None, type=str, help='set label')
-  op.allow_interspersed_args = False
-  opts, posargs = op.parse_args(args=list(args))
+  op = _item_parser()
+  opts, posargs = parse_args(op, args, intermixed=False)
 
   ITEMIZE = 1
   ENUMERATE = 2
@@ -772,24 +973,35 @@ def item(*args):
     print(f'lnote list: notebook not found: {opts.notebook}', file=sys.stderr)
     sys.exit(1)
 
-  # check last line of the notebook
-  with open(texpath(notebook), 'r') as f:
-    lines = f.readlines()
-  #while not lines[-1].strip():
-    #lines = lines[:-1]
-  if lines and '\\end{%s}' % listtypename in lines[-1]:
+  # check last line of the notebook (only read the end of the file)
+  with open(texpath(notebook), 'rb') as f:
+    lastline = read_tail(f, 1)[1].decode()
+  lines = []
+  if '\\end{%s}' % listtypename in lastline:
     prune('--notebook', notebook, '--force')
   else:
-    append_text(notebook, '\\begin{%s}' % listtypename)
+    lines.append('\\begin{%s}' % listtypename)
 
   # append item
   if opts.label is None:
-    append_text(notebook, '\\item %s' % ' '.join(posargs))
+    lines.append('\\item %s' % ' '.join(posargs))
   else:
-    append_text(notebook, '\\item[%s] %s' % (opts.label, ' '.join(posargs)))
+    lines.append('\\item[%s] %s' % (opts.label, ' '.join(posargs)))
 
   # end list environment
-  append_text(notebook, '\\end{%s}' % listtypename)
+  lines.append('\\end{%s}' % listtypename)
+  append_texts(notebook, *lines)
+
+
+@lru_cache(maxsize=None)
+def _marginnote_parser():
+  """Return the option parser of marginnote()."""
+  op = argparse.ArgumentParser(usage='%(prog)s marginnote [options] TEXT...',
+                               description=marginnote.__doc__)
+  op.add_argument('--version', action='version', version=__version__)
+  op.add_argument('-n', '--notebook', default=None, help='select notebook')
+  op.add_argument('posargs', nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+  return op
 
 
 def marginnote(*args):
@@ -798,12 +1010,8 @@ def marginnote(*args):
 
   If the selected notebook does not exist, it is created. By default, today's
   notebook is used."""
-  op = optparse.OptionParser(usage='%prog marginnote [options] TEXT...',
-                             version=__version__,
-                             description=marginnote.__doc__)
-  op.add_option('-n', '--notebook', default=None, help='select notebook')
-  op.allow_interspersed_args = False
-  opts, posargs = op.parse_args(args=list(args))
+  op = _marginnote_parser()
+  opts, posargs = parse_args(op, args, intermixed=False)
 
   # select notebook
   notebook = select_notebook(opts.notebook)
@@ -818,6 +1026,28 @@ def marginnote(*args):
 #=====================#
 
 
+def parse_args(parser, args, intermixed=True):
+  """Parse the given command line arguments, return the options and the list
+  of positional arguments. If intermixed is False, all arguments from the first
+  positional argument on are positional (the parser then has to collect them
+  using nargs=argparse.REMAINDER)."""
+  if intermixed:
+    # everything after "--" is positional, handle that here as
+    # parse_intermixed_args() does not support it
+    args = list(args)
+    rest = []
+    if '--' in args:
+      rest = args[args.index('--')+1:]
+      args = args[:args.index('--')]
+    opts = parser.parse_intermixed_args(args)
+    opts.posargs.extend(rest)
+  else:
+    opts = parser.parse_args(args)
+    if opts.posargs[:1] == ['--']:
+      del opts.posargs[0]
+  return opts, opts.posargs
+
+
 def printcols(strlist, ret=False):
   """Print the strings in the given list in column by column (similar the bash
   command "ls"), respecting the width of the shell window. If ret is True, give
@@ -827,40 +1057,79 @@ def printcols(strlist, ret=False):
   numstr = len(strlist)
   cols = get_cols()
   maxwidth = max([len(s) for s in strlist])
-  numcols = cols // (maxwidth + 2)
-  numrows = int(ceil(numstr / numcols))
-
-  # print the list
-  result = ''
-  for rind in range(numrows):
-    for cind in range(numcols):
-      sind = cind * numrows + rind
-      if sind < numstr:
-        result += strlist[sind] + ' ' * (maxwidth - len(strlist[sind]) + 2)
-    result = result.rstrip() + '\n'
+  cellwidth = maxwidth + 2
+  numcols = max(1, cols // cellwidth)
+
+  if numcols == 1:
+    # one string per line (also if the longest string is wider than the shell
+    # window)
+    result = '\n'.join(line for line in map(str.rstrip, strlist) if line)
+  else:
+    # print the list
+    numrows = -(-numstr // numcols)
+    rows = []
+    for rind in range(numrows):
+      row = []
+      for cind in range(numcols):
+        sind = cind * numrows + rind
+        if sind < numstr:
+          row.append(strlist[sind].ljust(cellwidth))
+      line = ''.join(row).rstrip()
+      if line:
+        rows.append(line)
+    result = '\n'.join(rows)
 
   # return or print result
   if ret:
-    return result.rstrip()
+    return result
   else:
-    print(result.rstrip())
+    print(result)
 
 
-def ceil(x):
-    """Return the ceiling of x. This exists as a substitute for numpy.ceil, to
-    avoid importing the huge numpy module just for this function."""
-    if int(x) == x or x <= 0:
-        return int(x)
-    else:
-        return int(x)+1
+# width of the terminal, determined once
+_COLS = None
 
 
 def get_cols():
-    try:
-        return int(subprocess.getoutput('tput cols'))
-    except ValueError:
-        # return default width
-        return 80
+    """Return the width of the terminal (default: 80 columns)."""
+    global _COLS
+    if _COLS is None:
+        _COLS = shutil.get_terminal_size((80, 24)).columns
+    return _COLS
+
+
+def find_process(program, filename):
+    """Return the ID of a running process of the given program that has the
+    given file among its arguments, or None if there is no such process. The
+    program is compared by its base name with the first word of the command
+    line, the file has to be one of the following arguments. On Linux, the
+    command lines are read from /proc, elsewhere "ps" is used (which cannot
+    tell arguments containing spaces apart)."""
+    program = os.path.basename(program)
+    if os.path.isdir('/proc'):
+        program, filename = os.fsencode(program), os.fsencode(filename)
+        with os.scandir('/proc') as entries:
+            for entry in entries:
+                if not entry.name.isdigit():
+                    continue
+                try:
+                    with open(os.path.join(entry.path, 'cmdline'), 'rb') as f:
+                        argv = f.read().rstrip(b'\0').split(b'\0')
+                except OSError:
+                    # process has already terminated or is not accessible
+                    continue
+                if os.path.basename(argv[0]) == program and filename in argv[1:]:
+                    return int(entry.name)
+    else:
+        lines = subprocess.run(['ps', '-eo', 'pid=,args='],
+                               stdout=subprocess.PIPE,
+                               universal_newlines=True).stdout.splitlines()
+        for line in lines:
+            pid, *argv = line.split()
+            if argv and os.path.basename(argv[0]) == program \
+                    and filename in argv[1:]:
+                return int(pid)
+    return None
 
 
 #def require_file(filename):
@@ -882,77 +1151,215 @@ def get_cols():
   #require_file(texpath(day))
 
 
+@lru_cache(maxsize=256)
 def texpath(notebook):
   """Return the path to the tex-file of the given notebook."""
   return os.path.join(LNOTE_DIR, notebook, notebook + '.tex')
 
 
+@lru_cache(maxsize=256)
 def dirpath(notebook):
   """Return the path to the directory of the given notebook."""
   return os.path.join(LNOTE_DIR, notebook)
 
 
+# contents of the data directory, reread only when its modification time
+# changes or after invalidate_notebooks() was called
+_listdir_cache = {'mtime': None, 'entries': None, 'days': None}
+
+
+def list_notebooks():
+  """Return the set of names in the data directory. The directory is only
+  read again if it has been modified in the meantime."""
+  mtime = os.stat(LNOTE_DIR).st_mtime_ns
+  if _listdir_cache['mtime'] != mtime:
+    _listdir_cache['entries'] = set(os.listdir(LNOTE_DIR))
+    _listdir_cache['days'] = None
+    _listdir_cache['mtime'] = mtime
+  return _listdir_cache['entries']
+
+
+def invalidate_notebooks():
+  """Forget the cached contents of the data directory. Call this after
+  changing the directory, in case its modification time did not change."""
+  _listdir_cache['mtime'] = None
+
+
+def _day_dirs():
+  """Return the sorted list of the names of all day notebooks, together with
+  the list of their Julian day numbers."""
+  entries = list_notebooks()
+  if _listdir_cache['days'] is None:
+    names, jdns = [], []
+    for name in sorted(fnmatch.filter(entries, '????-??-??')):
+      try:
+        jdns.append(greg2jdn(*_fast_ymd(name, '-', (0, 1, 2))))
+      except ValueError:
+        continue
+      names.append(name)
+    _listdir_cache['days'] = names, jdns
+  return _listdir_cache['days']
+
+
 #def append_linebreak(notebook):
   #"""Append linebreak to the given notebook."""
   #with open(texpath(notebook), 'a') as texfile:
     #texfile.write(' a\n')
 
 
+class NotebookWriter:
+  """Context manager for appending several texts to a notebook, opening its
+  tex-file only once. The texts are encoded as UTF-8 and buffered, and written
+  when the writer is closed (or the buffer is full). Use like this:
+
+    with NotebookWriter(notebook) as writer:
+      writer.append('some text')
+      writer.append('\n')
+  """
+
+  def __init__(self, notebook):
+    self.notebook = notebook
+    self.texfile = None
+
+  def __enter__(self):
+    self.texfile = open(texpath(self.notebook), 'ab')
+    return self
+
+  def __exit__(self, *exc_info):
+    self.texfile.close()
+    self.texfile = None
+
+  def append(self, text):
+    """Append text to the notebook. A single newline is written as it is (an
+    empty line), any other text is stripped and ended with a newline."""
+    if text == '\n':
+      self.texfile.write(b'\n')
+    else:
+      self.texfile.write((text.strip() + '\n').encode())
+
+
 def append_text(notebook, text):
   """Append text to the given notebook."""
-  if text != '\n':
-    text = text.strip()
-    text += '\n'
-  with open(texpath(notebook), 'a') as texfile:
-    texfile.write(text)
+  append_texts(notebook, text)
+
+
+def append_texts(notebook, *texts):
+  """Append several texts to the given notebook at once, opening the
+  tex-file only once. Each text is treated like in append_text()."""
+  with NotebookWriter(notebook) as writer:
+    for text in texts:
+      writer.append(text)
 
 
 class DayFormatError(BaseException):
   pass
 
 
+# date formats understood by opt2day() and opt2dayrange()
+_DATE_RE = re.compile(r'(?P<year>\d+)'
+                      r'|(?P<month>\d+\s*/\s*\d+)'
+                      r'|(?P<slash>\d+/\d+/\d+)'
+                      r'|(?P<dash>\d+-\d+-\d+)'
+                      r'|(?P<dot>\d+\.\d+\.\d*)')
+
+
+def date_kind(opt):
+  """Return the kind of date the given string represents: "year" (2023),
+  "month" (2023/05), "slash" (2023/05/17), "dash" (2023-05-17) or "dot"
+  (17.05.2023 or 17.05.). Return None if the string is not of any of these
+  forms. Surrounding whitespace is ignored."""
+  match = _DATE_RE.fullmatch(opt.strip())
+  return match.lastgroup if match else None
+
+
+def _prefix_table(*words):
+  """Return a dictionary that maps every prefix of the given words (including
+  the empty string) to the word. If a prefix is shared by several words, the
+  first of them wins."""
+  table = {}
+  for word in words:
+    for i in range(len(word) + 1):
+      table.setdefault(word[:i], word)
+  return table
+
+
+_KEYWORDS = _prefix_table('today', 'yesterday', 'tomorrow', 'first', 'last')
+
+
+# today's date, cached until the next midnight
+_today_cache = {'expires': 0, 'today': None}
+
+
+def _today_ymd():
+  """Return year, month, day and Julian day number of today (local time). The
+  result is cached until the next midnight."""
+  now = time.time()
+  if now >= _today_cache['expires']:
+    t = time.localtime(now)
+    _today_cache['today'] = (t.tm_year, t.tm_mon, t.tm_mday,
+                             greg2jdn(t.tm_year, t.tm_mon, t.tm_mday))
+    _today_cache['expires'] = time.mktime((t.tm_year, t.tm_mon, t.tm_mday + 1,
+                                           0, 0, 0, 0, 0, -1))
+  return _today_cache['today']
+
+
 def opt2day(opt):
   """Convert option string to a certain date. Return as Julian day number
   (integer)."""
   opt = opt.strip()
-  now = time.localtime()
-
-  if 'today'.startswith(opt.lower()):
-    return greg2jdn(now.tm_year, now.tm_mon, now.tm_mday)
-  elif 'yesterday'.startswith(opt.lower()):
-    return greg2jdn(now.tm_year, now.tm_mon, now.tm_mday)-1
-  elif 'tomorrow'.startswith(opt.lower()):
-    return greg2jdn(now.tm_year, now.tm_mon, now.tm_mday)+1
-  elif 'first'.startswith(opt.lower()):
-    possible = fnmatch.filter(os.listdir(LNOTE_DIR), '????-??-??')
-    possible.sort()
-    first = possible[0]
-    year, mon, mday = first.split('-')
-    thatday = greg2jdn(year, mon, mday)
-    return thatday, thatday+1
-  elif 'last'.startswith(opt.lower()):
-    possible = fnmatch.filter(os.listdir(LNOTE_DIR), '????-??-??')
-    possible.sort()
-    last = possible[-1]
-    year, mon, mday = last.split('-')
-    return greg2jdn(year, mon, mday)
-  elif opt.count('/') == 2:
+  thisyear, _, _, today = _today_ymd()
+
+  keyword = _KEYWORDS.get(opt.lower())
+  if keyword == 'today':
+    return today
+  elif keyword == 'yesterday':
+    return today-1
+  elif keyword == 'tomorrow':
+    return today+1
+  elif keyword == 'first':
+    return _day_dirs()[1][0]
+  elif keyword == 'last':
+    return _day_dirs()[1][-1]
+  else:
+    return _parse_day(opt, thisyear)
+
+
+@lru_cache(maxsize=256)
+def _parse_day(opt, year):
+  """Convert a date string (not a keyword like "today") to a Julian day
+  number. The given year is used for dates of the form "17.05.". Results are
+  cached, as the keywords that depend on the current day or on the data
+  directory are handled by opt2day() itself."""
+  kind = date_kind(opt)
+  if kind == 'slash':
+    try:
+      return greg2jdn(*_fast_ymd(opt, '/', (0, 1, 2)))
+    except ValueError:
+      pass
     format = '%Y/%m/%d' if len(opt.split('/')[0]) == 4 else '%y/%m/%d'
     try:
         then = time.strptime(opt, format)
     except ValueError:
         raise DayFormatError(f'bad day format: {opt}')
     return greg2jdn(then.tm_year, then.tm_mon, then.tm_mday)
-  elif opt.count('-') == 2:
+  elif kind == 'dash':
+    try:
+      return greg2jdn(*_fast_ymd(opt, '-', (0, 1, 2)))
+    except ValueError:
+      pass
     format = '%Y-%m-%d' if len(opt.split('-')[0]) == 4 else '%y-%m-%d'
     try:
         then = time.strptime(opt, format)
     except ValueError:
         raise DayFormatError(f'bad day format: {opt}')
     return greg2jdn(then.tm_year, then.tm_mon, then.tm_mday)
-  elif opt.count('.') == 2:
+  elif kind == 'dot':
     if opt[-1] == '.':
-      opt += str(now.tm_year)
+      opt += str(year)
+    try:
+      return greg2jdn(*_fast_ymd(opt, '.', (2, 1, 0)))
+    except ValueError:
+      pass
     format = '%d.%m.%Y' if len(opt.split('.')[-1]) == 4 else '%d.%m.%y'
     try:
         then = time.strptime(opt, format)
@@ -963,6 +1370,29 @@ def opt2day(opt):
     raise DayFormatError(f'bad day format: {opt}')
 
 
+def _fast_ymd(opt, sep, order):
+  """Split a date string like "2023-05-17" or "17.05.23" into year, month and
+  day without the overhead of time.strptime(). The separator and the position
+  of year, month and day within the string are given. Two-digit years are
+  mapped like "%y" does (69-99 to 19xx, 00-68 to 20xx). Raise ValueError for
+  anything unusual, e.g. an invalid date, so that the caller can fall back to
+  time.strptime()."""
+  parts = opt.split(sep)
+  ystr, mstr, dstr = (parts[i] for i in order)
+  if len(ystr) not in (2, 4) or not 0 < len(mstr) <= 2 \
+      or not 0 < len(dstr) <= 2:
+    raise ValueError(f'not a plain date: {opt}')
+  # int() would also accept signs and whitespace (e.g. "2023-+1-05")
+  if not all(part.isascii() and part.isdigit() for part in (ystr, mstr, dstr)):
+    raise ValueError(f'not a plain date: {opt}')
+  year, mon, mday = int(ystr), int(mstr), int(dstr)
+  if len(ystr) == 2:
+    year += 1900 if year >= 69 else 2000
+  if year < 1 or jdn2greg(greg2jdn(year, mon, mday)) != (year, mon, mday):
+    raise ValueError(f'invalid date: {opt}')
+  return year, mon, mday
+
+
 def opt2days(opt):
   """Convert option string to a list of dates. Return list of integers
   (Julian day numbers)."""
@@ -973,106 +1403,70 @@ class DayRangeFormatError(DayFormatError):
   pass
 
 
+_MONTH_NAMES = ('january', 'february', 'march', 'april', 'may', 'june', 'july',
+                'august', 'september', 'october', 'november', 'december')
+_MONTHS = _prefix_table(*_MONTH_NAMES)
+del _MONTHS['']
+
+
+def _parse_period(opt, exclude=None):
+  """Convert a string denoting a period of days (a month name of the current
+  year, a keyword like "today", a year, a month or a single day) to a
+  timerange. Return as tuple with two integers (JDN1, JDN2+1) (Julian day
+  numbers). The keyword given by exclude is not accepted."""
+  thisyear, _, _, today = _today_ymd()
+  month = _MONTHS.get(opt.lower())
+  if month:
+    mon = _MONTH_NAMES.index(month) + 1
+    return greg2jdn(thisyear, mon, 1), greg2jdn(thisyear, mon+1, 1)
+
+  keyword = _KEYWORDS.get(opt.lower())
+  if keyword == exclude:
+    keyword = None
+  if keyword == 'today':
+    return today, today+1
+  elif keyword == 'yesterday':
+    return today-1, today
+  elif keyword == 'tomorrow':
+    return today+1, today+2
+  elif keyword == 'first':
+    thatday = _day_dirs()[1][0]
+    return thatday, thatday+1
+  elif keyword == 'last':
+    thatday = _day_dirs()[1][-1]
+    return thatday, thatday+1
+
+  kind = date_kind(opt)
+  if kind == 'year':
+    return greg2jdn(int(opt), 1, 1), greg2jdn(int(opt)+1, 1, 1)
+  elif kind == 'month':
+    year, mon = opt.split('/')
+    return greg2jdn(year, mon, 1), greg2jdn(year, int(mon)+1, 1)
+  elif kind in ('slash', 'dash', 'dot'):
+    thatday = opt2day(opt)
+    return thatday, thatday+1
+  else:
+    raise ValueError(f'bad timerange: {opt}')
+
+
 def opt2dayrange(opt):
   """Convert option string to a timerange. Return as tuple with two integers
   (JDN1, JDN2+1) (Julian day numbers)."""
   opt = opt.strip()
-  months = ['january', 'february', 'march', 'april', 'may', 'june', 'july',
-            'august', 'september', 'october', 'november', 'december']
-  now = time.localtime()
   try:
     if not opt:
       # return "empty" range, not selecting any days
-      return (opt2day('today'),) * 2
+      return (_today_ymd()[3],) * 2
     if opt.count('-') > 1:
       raise ValueError('only one dash (-) allowed in timerange')
     if opt.count('-') == 1:
+      # the range reaches from the beginning of the first period to the end
+      # of the second one
       begin, end = opt.split('-')
-      for m, mon in enumerate(months):
-        if begin and mon.startswith(begin.lower()):
-          rbegin = greg2jdn(now.tm_year, m+1, 1)
-          break
-      else:
-        if 'today'.startswith(begin.lower()):
-          rbegin = greg2jdn(now.tm_year, now.tm_mon, now.tm_mday)
-        elif 'yesterday'.startswith(begin.lower()):
-          rbegin = greg2jdn(now.tm_year, now.tm_mon, now.tm_mday)-1
-        elif 'tomorrow'.startswith(begin.lower()):
-          rbegin = greg2jdn(now.tm_year, now.tm_mon, now.tm_mday)+1
-        elif 'first'.startswith(begin.lower()):
-          possible = fnmatch.filter(os.listdir(LNOTE_DIR), '????-??-??')
-          possible.sort()
-          first = possible[0]
-          year, mon, mday = first.split('-')
-          rbegin = greg2jdn(year, mon, mday)
-        elif begin and begin.count('/')+begin.count('-')+begin.count('.') == 0:
-          rbegin = greg2jdn(int(begin), 1, 1)
-        elif begin and begin.count('/') == 1:
-          year, mon = begin.split('/')
-          rbegin = greg2jdn(year, mon, 1)
-        else:
-          rbegin = opt2day(begin) if begin else 0
-      for m, mon in enumerate(months):
-        if end and mon.startswith(end.lower()):
-          rend = greg2jdn(now.tm_year, m+2, 1)
-          break
-      else:
-        if 'today'.startswith(end.lower()):
-          rend = greg2jdn(now.tm_year, now.tm_mon, now.tm_mday)+1
-        elif 'yesterday'.startswith(end.lower()):
-          rend = greg2jdn(now.tm_year, now.tm_mon, now.tm_mday)
-        elif 'tomorrow'.startswith(end.lower()):
-          rend = greg2jdn(now.tm_year, now.tm_mon, now.tm_mday)+2
-        elif 'last'.startswith(end.lower()):
-          possible = fnmatch.filter(os.listdir(LNOTE_DIR), '????-??-??')
-          possible.sort()
-          last = possible[-1]
-          year, mon, mday = last.split('-')
-          rend = greg2jdn(year, mon, mday)+1
-        elif end and end.count('/')+end.count('-')+end.count('.') == 0:
-          rend = greg2jdn(int(end)+1, 1, 1)
-        elif end and end.count('/') == 1:
-          year, mon = end.split('/')
-          rend = greg2jdn(year, int(mon)+1, 1)
-        else:
-          rend = opt2day(end)+1 if end else opt2day('today')+1
-      return rbegin, rend
+      return (_parse_period(begin, exclude='last')[0],
+              _parse_period(end, exclude='first')[1])
     else:
-      for m, mon in enumerate(months):
-        if mon.startswith(opt.lower()):
-          return greg2jdn(now.tm_year, m+1, 1), greg2jdn(now.tm_year, m+2, 1)
-      else:
-        if 'today'.startswith(opt.lower()):
-          today = greg2jdn(now.tm_year, now.tm_mon, now.tm_mday)
-          return today, today+1
-        elif 'yesterday'.startswith(opt.lower()):
-          yesterday = greg2jdn(now.tm_year, now.tm_mon, now.tm_mday)-1
-          return yesterday, yesterday+1
-        elif 'tomorrow'.startswith(opt.lower()):
-          tomorrow = greg2jdn(now.tm_year, now.tm_mon, now.tm_mday)+1
-          return tomorrow, tomorrow+1
-        elif 'first'.startswith(opt.lower()):
-          possible = fnmatch.filter(os.listdir(LNOTE_DIR), '????-??-??')
-          possible.sort()
-          first = possible[0]
-          year, mon, mday = first.split('-')
-          thatday = greg2jdn(year, mon, mday)
-          return thatday, thatday+1
-        elif 'last'.startswith(opt.lower()):
-          possible = fnmatch.filter(os.listdir(LNOTE_DIR), '????-??-??')
-          possible.sort()
-          last = possible[-1]
-          year, mon, mday = last.split('-')
-          thatday = greg2jdn(year, mon, mday)
-          return thatday, thatday+1
-        elif opt and opt.count('/')+opt.count('-')+opt.count('.') == 0:
-          return greg2jdn(int(opt), 1, 1), greg2jdn(int(opt)+1, 1, 1)
-        elif opt and opt.count('/') == 1:
-          year, mon = opt.split('/')
-          return greg2jdn(year, mon, 1), greg2jdn(year, int(mon)+1, 1)
-        else:
-          j = opt2day(opt)
-          return j, j+1
+      return _parse_period(opt)
   except (DayFormatError, ValueError):
     raise DayRangeFormatError(f'bad dayrange format: {opt}')
 
@@ -1093,6 +1487,7 @@ def greg2jdn(year, mon, mday):
   return mday + (153 * m + 2) // 5 + 365 * y + y // 4 - y // 100 + y // 400 - 32045
 
 
+@lru_cache(maxsize=256)
 def jdn2greg(jdn):
   """Convert Julian day number to Gregorian date.
   Reference: http://en.wikipedia.org/wiki/Julian_Date"""
@@ -1111,6 +1506,7 @@ def jdn2greg(jdn):
   return year, mon, mday
 
 
+@lru_cache(maxsize=256)
 def date2filename(year, mon, mday):
   """Convert Gregorian date to filename."""
   return '%04i-%02i-%02i' % (year, mon, mday)
@@ -1122,14 +1518,14 @@ def select_notebook(pattern, forgiving=False):
   create a new notebook if pattern is None or empty."""
   if pattern:
     # try to find a notebook with that name
-    if pattern in os.listdir(LNOTE_DIR):
+    if pattern in list_notebooks():
       notebook = pattern
     else:
       # try to interprete string as a day
       try:
         year, mon, mday = jdn2greg(opt2day(pattern))
         notebook = date2filename(year, mon, mday)
-        if notebook not in os.listdir(LNOTE_DIR):
+        if notebook not in list_notebooks():
           create(notebook)
       except DayFormatError:
         if forgiving:
@@ -1139,9 +1535,9 @@ def select_notebook(pattern, forgiving=False):
           raise SelectNotebookError(pattern)
   else:
     # use today
-    year, mon, mday = jdn2greg(opt2day('today'))
+    year, mon, mday = _today_ymd()[:3]
     notebook = date2filename(year, mon, mday)
-    if notebook not in os.listdir(LNOTE_DIR):
+    if notebook not in list_notebooks():
       create(notebook)
   return notebook
 
@@ -1162,16 +1558,18 @@ def select_notebooks(*patterns, **kwargs):
 
   notebooks = []
   for pattern in patterns:
-    # first try to glob
-    raised = False
-    try:
-        results = glob.glob(os.path.join(LNOTE_DIR, pattern))
-    except:
-        raised = True
-    if not raised and len(results) != 0:
-        #results.sort()
-        for result in results:
-            notebook = os.path.basename(result)
+    # first try to match the pattern against the notebook names
+    if pattern and pattern.strip('*') == '':
+      # pattern matches everything
+      results = [name for name in sorted(list_notebooks())
+                 if not name.startswith('.')]
+    else:
+      regex = pattern2regex(pattern)
+      results = [name for name in sorted(list_notebooks())
+                 if regex.match(name)
+                 and (pattern.startswith('.') or not name.startswith('.'))]
+    if len(results) != 0:
+        for notebook in results:
             if not unique or notebook not in notebooks:
                 notebooks.append(notebook)
     else:
@@ -1185,26 +1583,57 @@ def select_notebooks(*patterns, **kwargs):
                 raise SelectNotebookError(pattern)
 
         # select all notebooks according to dayrange
-        dirnames = os.listdir(LNOTE_DIR)
-        dirnames.sort()
-        for dirname in dirnames:
-            try:
-               date = time.strptime(dirname, '%Y-%m-%d')
-            except ValueError:
-               continue
-            jdn = greg2jdn(date.tm_year, date.tm_mon, date.tm_mday)
-            if jdn >= dayrange[0] and jdn < dayrange[1]:
-                if not unique or dirname not in notebooks:
-                    notebooks.append(dirname)
+        dirnames, jdns = _day_dirs()
+        start = bisect.bisect_left(jdns, dayrange[0])
+        stop = bisect.bisect_left(jdns, dayrange[1])
+        for dirname in dirnames[start:stop]:
+            if not unique or dirname not in notebooks:
+                notebooks.append(dirname)
   return notebooks
 
 
+def pattern2regex(pattern):
+  """Compile the given shell-style wildcard pattern to a regular expression.
+  Runs of "*" are collapsed first, as they would otherwise make matching
+  exponentially slow."""
+  return re.compile(fnmatch.translate(re.sub(r'\*+', '*', pattern)))
+
+
 def plural(number):
   """If abs(number) == 1, return "", otherwise return "s". For conveniently
   appending the plural "s" to words depending on some number."""
   return '' if abs(number) == 1 else 's'
 
 
+def _stat_walk(path):
+    """Walk the given directory tree, visiting (and stat'ing) each entry only
+    once. Return the total size of all files in bytes, the number of entries
+    at the top level and the last modification time of the tree. Symbolic
+    links to directories are not followed."""
+    total_size = 0
+    count = 0
+    mtime = os.path.getmtime(path)
+    dirs = [path]
+    while dirs:
+        current = dirs.pop()
+        with os.scandir(current) as entries:
+            for entry in entries:
+                if current == path:
+                    count += 1
+                if entry.is_dir(follow_symlinks=False):
+                    dirs.append(entry.path)
+                    newmtime = entry.stat(follow_symlinks=False).st_mtime
+                elif entry.is_dir():
+                    continue
+                else:
+                    stat = entry.stat()
+                    total_size += stat.st_size
+                    newmtime = stat.st_mtime
+                if newmtime > mtime:
+                    mtime = newmtime
+    return total_size, count, mtime
+
+
 def get_size(path):
     """Return total size of a file or directory in bytes.
 
@@ -1212,38 +1641,134 @@ def get_size(path):
     http://stackoverflow.com/questions/1392413/calculating-a-directory-size-using-python
     """
     if os.path.isdir(path):
-        total_size = 0
-        for dirpath, dirnames, filenames in os.walk(path):
-            for f in filenames:
-                fp = os.path.join(dirpath, f)
-                total_size += os.path.getsize(fp)
-        return total_size
+        return _stat_walk(path)[0]
     elif os.path.isfile(path):
         return os.path.getsize(path)
     else:
         return -1
 
 
-def get_mtime(path):
-    """Return last modification time of a file or all files within a directory
-    tree (in seconds since the epoch).
-    """
-    if os.path.isdir(path):
-        mtime = os.path.getmtime(path)
-        for dirpath, dirnames, filenames in os.walk(path):
-            newmtime = os.path.getmtime(dirpath)
-            if newmtime > mtime:
-                mtime = newmtime
-            for f in filenames:
-                fp = os.path.join(dirpath, f)
-                newmtime = os.path.getmtime(fp)
-                if newmtime > mtime:
-                    mtime = newmtime
-        return mtime
-    elif os.path.isfile(path):
-        return os.path.getmtime(path)
-    else:
-        return -1
+def remove_tree(path, ignore_errors=False):
+    """Remove a directory tree. The file types reported by os.scandir are used
+    to tell directories from files, which saves a stat for every entry. Like
+    shutil.rmtree, refuse to remove a symbolic link to a directory (and the
+    directory it points to). If ignore_errors is True, errors are ignored and
+    as much as possible is removed."""
+    try:
+        if os.path.islink(path):
+            raise OSError(f'Cannot call rmtree on a symbolic link: {path}')
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    remove_tree(entry.path, ignore_errors)
+                    continue
+                try:
+                    os.unlink(entry.path)
+                except OSError:
+                    if not ignore_errors:
+                        raise
+        os.rmdir(path)
+    except OSError:
+        if not ignore_errors:
+            raise
+
+
+def count_lines(path):
+    """Return the number of lines of a file. A last line without a trailing
+    newline counts as well."""
+    count = 0
+    last = b'\n'
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(1 << 16)
+            if not block:
+                break
+            count += block.count(b'\n')
+            last = block[-1:]
+    if last != b'\n':
+        count += 1
+    return count
+
+
+def read_tail(f, number):
+    """Read the last lines of the given file object (opened in binary mode)
+    by seeking backwards from the end of the file. Return the offset at which
+    these lines begin, and the lines themselves."""
+    f.seek(0, os.SEEK_END)
+    pos = f.tell()
+    tail = b''
+    while pos > 0:
+        step = min(1 << 16, pos)
+        pos -= step
+        f.seek(pos)
+        tail = f.read(step) + tail
+
+        # a newline at the very end does not start another line
+        if tail[:-1].count(b'\n') >= number:
+            break
+
+    # find the beginning of the first of the selected lines
+    start = len(tail) - 1
+    for i in range(number):
+        start = tail.rfind(b'\n', 0, start)
+        if start < 0:
+            break
+    start += 1
+    return pos + start, tail[start:]
+
+
+def copy_stripped(src, dst, size=-1):
+    """Copy the contents of one file object to another (both opened in binary
+    mode), leaving out leading and trailing whitespace. If size is
+    non-negative, copy at most that many bytes."""
+    started = False
+    pending = b''
+    while size != 0:
+        block = src.read(1 << 20 if size < 0 else min(1 << 20, size))
+        if not block:
+            break
+        if size > 0:
+            size -= len(block)
+        if not started:
+            block = block.lstrip()
+            if not block:
+                continue
+            started = True
+
+        # hold back trailing whitespace until more text follows
+        body = block.rstrip()
+        if body:
+            dst.write(pending)
+            dst.write(body)
+            pending = block[len(body):]
+        else:
+            pending += block
+
+
+def export_key(notebooks, date=False):
+    """Return a key identifying the export of the given notebooks. It changes
+    whenever any file of the notebooks, the notebook selection, the date option
+    or the LaTeX preamble changes."""
+    import hashlib  # slow to import
+    key = hashlib.blake2b(digest_size=16)
+    key.update(struct.pack('?', date))
+    key.update(_PREAMBLE)
+    key.update(_EPILOG)
+    for notebook in notebooks:
+        key.update(os.fsencode(notebook) + b'\0')
+        with os.scandir(dirpath(notebook)) as entries:
+            for entry in sorted(entries, key=lambda entry: entry.name):
+                stat = entry.stat()
+                key.update(os.fsencode(entry.name) + b'\0')
+                key.update(struct.pack('<qq', stat.st_mtime_ns, stat.st_size))
+    return key.hexdigest()
+
+
+def get_stats(path):
+    """Return total size in bytes, number of entries and last modification
+    time of a directory tree in a single pass. The number of entries only
+    counts the top level of the directory."""
+    return _stat_walk(path)
 
 
 #==============#
@@ -1297,11 +1822,48 @@ _cmd2func = {
             }
 
 
+def _group_commands(cmd2func):
+    """Group the given commands by the name of the function they call. Return
+    a dictionary that maps each function name to its long and short command
+    names."""
+    cmds = {}
+    for cmd, func in cmd2func.items():
+        func = func.__name__
+        if func not in cmds:
+            cmds[func] = {'longs': [], 'shorts': []}
+        if len(cmd) == 1:
+            cmds[func]['shorts'].append(cmd)
+        else:
+            cmds[func]['longs'].append(cmd)
+    return cmds
+
+
+def _cmdstring(cmd):
+    """Format a command group for the help text, e.g. "create (c)"."""
+    cmdstring = ''
+    if len(cmd['longs']) != 0:
+        cmdstring += cmd['longs'][0]
+        if len(cmd['shorts']) != 0:
+            cmdstring += ' ('
+            cmdstring += ', '.join(short for short in cmd['shorts'])
+            cmdstring += ')'
+    else:
+        cmdstring += ', '.join(short for short in cmd['shorts'])
+    return cmdstring
+
+
+# command groups and their entries in the help text, sorted by function name
+_CMD_GROUPS = _group_commands(_cmd2func)
+_CMDSTRINGS = [_cmdstring(_CMD_GROUPS[key]) for key in sorted(_CMD_GROUPS)]
+
+# words for custom tab completion
+_COMP_WORDS = ' '.join(sorted(_cmd2func.keys()))
+
+
 def call():
     # return words for custom tab completion
     if len(sys.argv) == 2 and sys.argv[1] == '--comp-words':
-        keys = sorted(_cmd2func.keys())
-        print(' '.join(keys))
+        print(_COMP_WORDS)
         sys.exit(0)
 
     # to enable custom tab completion, add the following lines to your .bashrc
@@ -1342,35 +1904,10 @@ def call():
 
     if len(sys.argv) == 1 or sys.argv[1] in ('-?', '--help'):
         # display help
-        cmds = {}
-        for cmd, func in _cmd2func.items():
-            func = func.__name__
-            if func not in cmds:
-                cmds[func] = {'longs': [], 'shorts': []}
-            if len(cmd) == 1:
-                cmds[func]['shorts'].append(cmd)
-            else:
-                cmds[func]['longs'].append(cmd)
-
-        keys = sorted(cmds.keys())
-        cmdstrings = []
-        for key in keys:
-            cmd = cmds[key]
-            cmdstring = ''
-            if len(cmd['longs']) != 0:
-                cmdstring += cmd['longs'][0]
-                if len(cmd['shorts']) != 0:
-                    cmdstring += ' ('
-                    cmdstring += ', '.join(short for short in cmd['shorts'])
-                    cmdstring += ')'
-            else:
-                cmdstring += ', '.join(short for short in cmd['shorts'])
-            cmdstrings.append(cmdstring)
-
         print(__doc__)
         print()
         print('Available commands (with shortcuts):')
-        printcols(cmdstrings)
+        printcols(_CMDSTRINGS)
         print()
         print('To get help to a specific command, use "-?", e.g. "lnote create -?"')
     else: